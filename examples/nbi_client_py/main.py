@@ -12,144 +12,308 @@ generation is required.
 from __future__ import annotations
 
 import argparse
+import asyncio
+import functools
+import mmap
+import os
 import pathlib
-from typing import Iterable, Tuple
+import struct
+import sys
+from typing import Iterable, List, Tuple
+
+# Select the native (upb) protobuf backend before google.protobuf is imported;
+# the pure-Python fallback makes ScenarioSnapshot parsing the dominant cost.
+os.environ.setdefault("PROTOCOL_BUFFERS_PYTHON_IMPLEMENTATION", "upb")
 
 import grpc
-from google.protobuf import descriptor_pb2, descriptor_pool, empty_pb2, json_format, message_factory
+from google.protobuf import descriptor_pb2, descriptor_pool, empty_pb2, message_factory
+from google.protobuf.internal import api_implementation
+
+if api_implementation.Type() not in ("upb", "cpp"):
+    raise RuntimeError(
+        f"native protobuf backend unavailable (got {api_implementation.Type()!r}); "
+        "install a protobuf binary wheel from requirements.txt"
+    )
+
+
+# Message classes we care about, exposed as DynamicNBI attributes.
+_MESSAGE_TYPES = (
+    ("PlatformDefinition", "aalyria.spacetime.api.common.PlatformDefinition"),
+    ("Motion", "aalyria.spacetime.api.common.Motion"),
+    ("PointAxes", "aalyria.spacetime.api.common.PointAxes"),
+    ("Cartesian", "aalyria.spacetime.api.common.Cartesian"),
+    ("NetworkNode", "aalyria.spacetime.api.nbi.v1alpha.resources.NetworkNode"),
+    ("NetworkInterface", "aalyria.spacetime.api.nbi.v1alpha.resources.NetworkInterface"),
+    ("WirelessDevice", "aalyria.spacetime.api.nbi.v1alpha.resources.WirelessDevice"),
+    ("BidirectionalLink", "aalyria.spacetime.api.nbi.v1alpha.resources.BidirectionalLink"),
+    ("TransceiverModelId", "aalyria.spacetime.api.common.TransceiverModelId"),
+    ("ClearScenarioRequest", "aalyria.spacetime.api.nbi.v1alpha.ClearScenarioRequest"),
+    ("GetScenarioRequest", "aalyria.spacetime.api.nbi.v1alpha.GetScenarioRequest"),
+    ("LoadScenarioRequest", "aalyria.spacetime.api.nbi.v1alpha.LoadScenarioRequest"),
+    ("ScenarioSnapshot", "aalyria.spacetime.api.nbi.v1alpha.ScenarioSnapshot"),
+)
+
+# Fully-qualified RPC method paths.
+_CLEAR_SCENARIO = "/aalyria.spacetime.api.nbi.v1alpha.ScenarioService/ClearScenario"
+_CREATE_PLATFORM = "/aalyria.spacetime.api.nbi.v1alpha.PlatformService/CreatePlatform"
+_CREATE_NODE = "/aalyria.spacetime.api.nbi.v1alpha.NetworkNodeService/CreateNode"
+_CREATE_LINK = "/aalyria.spacetime.api.nbi.v1alpha.NetworkLinkService/CreateLink"
+_LOAD_SCENARIO = "/aalyria.spacetime.api.nbi.v1alpha.ScenarioService/LoadScenario"
+_GET_SCENARIO = "/aalyria.spacetime.api.nbi.v1alpha.ScenarioService/GetScenario"
+
+# Channel tuning for large scenarios. Keepalive pings are deliberately left
+# off: the NBI server uses grpc-go's default enforcement policy and would
+# answer frequent pings with GOAWAY (too_many_pings).
+_CHANNEL_OPTIONS = (
+    ("grpc.max_send_message_length", 64 << 20),
+    ("grpc.max_receive_message_length", 64 << 20),
+    ("grpc.http2.max_frame_size", (1 << 24) - 1),  # HTTP/2 maximum
+    ("grpc.use_local_subchannel_pool", 1),
+)
+
+
+@functools.lru_cache(maxsize=None)
+def _load_pool(descriptor_path: pathlib.Path) -> descriptor_pool.DescriptorPool:
+    """Parse a descriptor set once per process and return its pool."""
+    pool = descriptor_pool.DescriptorPool()
+    fds = descriptor_pb2.FileDescriptorSet()
+    # Parse straight from the page cache instead of copying the file into
+    # bytes. upb takes a memoryview but not the mmap itself, and the view must
+    # be released before the mapping closes. An empty file raises ValueError
+    # from mmap; it would not contain any usable descriptors anyway.
+    with open(descriptor_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        with memoryview(mm) as view:
+            fds.ParseFromString(view)
+    for fd in fds.file:
+        pool.Add(fd)
+    return pool
+
+
+def _varint(n: int) -> bytes:
+    out = bytearray()
+    while n > 0x7F:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+    return bytes(out)
+
+
+def _string_field(number: int, value: str) -> bytes:
+    """Encode a length-delimited string field in protobuf wire format."""
+    data = value.encode("utf-8")
+    return _varint(number << 3 | 2) + _varint(len(data)) + data
 
 
 class DynamicNBI:
     """Tiny helper that builds messages and invokes RPCs from a descriptor set."""
 
-    def __init__(self, channel: grpc.Channel, descriptor_path: pathlib.Path, timeout: float = 10.0) -> None:
+    def __init__(self, channel: grpc.aio.Channel, descriptor_path: pathlib.Path, timeout: float = 10.0) -> None:
         self.channel = channel
         self.timeout = timeout
 
-        pool = descriptor_pool.DescriptorPool()
-        fds = descriptor_pb2.FileDescriptorSet()
-        fds.ParseFromString(descriptor_path.read_bytes())
-        for fd in fds.file:
-            pool.Add(fd)
-
-        factory = message_factory.MessageFactory(pool)
-        self.pool = pool
-        self.factory = factory
-
-        # Message prototypes we care about
-        self.PlatformDefinition = self._msg("aalyria.spacetime.api.common.PlatformDefinition")
-        self.NetworkNode = self._msg("aalyria.spacetime.api.nbi.v1alpha.resources.NetworkNode")
-        self.NetworkInterface = self._msg("aalyria.spacetime.api.nbi.v1alpha.resources.NetworkInterface")
-        self.BidirectionalLink = self._msg("aalyria.spacetime.api.nbi.v1alpha.resources.BidirectionalLink")
-        self.TransceiverModelId = self._msg("aalyria.spacetime.api.common.TransceiverModelId")
-        self.ClearScenarioRequest = self._msg("aalyria.spacetime.api.nbi.v1alpha.ClearScenarioRequest")
-        self.GetScenarioRequest = self._msg("aalyria.spacetime.api.nbi.v1alpha.GetScenarioRequest")
-        self.ScenarioSnapshot = self._msg("aalyria.spacetime.api.nbi.v1alpha.ScenarioSnapshot")
-
-        motion_enum = pool.FindEnumTypeByName("aalyria.spacetime.api.common.PlatformDefinition.MotionSource")
-        self.motion_unknown = motion_enum.values_by_name["UNKNOWN_SOURCE"].number
+        # Descriptor parsing is shared by every client in the process; RPC
+        # callables are cached per client since they are bound to a channel.
+        self.pool = _load_pool(descriptor_path.resolve())
+        self._stub = functools.lru_cache(maxsize=None)(self._make_stub)
 
-    def _msg(self, name: str):
-        return self.factory.GetPrototype(self.pool.FindMessageTypeByName(name))
+        for attr, name in _MESSAGE_TYPES:
+            setattr(self, attr, self._msg(name))
+
+        # Both requests have no fields, so their wire encoding never changes.
+        self._empty_clear_req = self.ClearScenarioRequest().SerializeToString()
+        self._empty_get_req = self.GetScenarioRequest().SerializeToString()
+
+        motion_enum = self.pool.FindEnumTypeByName("aalyria.spacetime.api.common.PlatformDefinition.MotionSource")
+        self.motion_unknown = motion_enum.values_by_name["UNKNOWN_SOURCE"].number
 
-    def _parse(self, cls, data: bytes):
-        msg = cls()
-        msg.ParseFromString(data)
-        return msg
+        # CreatePlatform requests differ only in name, type and coordinates.
+        # Serialize the fixed part once with sentinel coordinates, then patch
+        # the doubles in place and append the string fields per call; parsers
+        # accept fields in any order on the wire.
+        sentinels = (1.5, 2.5, 3.5)
+        point = self.Cartesian(x_m=sentinels[0], y_m=sentinels[1], z_m=sentinels[2])
+        template = self.PlatformDefinition(
+            motion_source=self.motion_unknown,
+            coordinates=self.Motion(ecef_fixed=self.PointAxes(point=point)),
+        ).SerializeToString()
+        self._platform_template = template
+        self._platform_coord_offsets = tuple(template.index(struct.pack("<d", v)) for v in sentinels)
+        fields = self.PlatformDefinition.DESCRIPTOR.fields_by_name
+        self._platform_name_field = fields["name"].number
+        self._platform_type_field = fields["type"].number
 
-    def _unary(self, method: str, request, response_cls):
-        call = self.channel.unary_unary(
+    def _msg(self, name: str):
+        return message_factory.GetMessageClass(self.pool.FindMessageTypeByName(name))
+
+    def _make_stub(self, method: str, request_cls, response_cls, raw: bool = False):
+        # Raw stubs take an already-serialized request; gRPC sends bytes
+        # unchanged when no serializer is configured. FromString parses the
+        # received bytes in place via the buffer protocol, so wrapping them in
+        # a memoryview would not save a copy.
+        return self.channel.unary_unary(
             method,
-            request_serializer=request.SerializeToString,
-            response_deserializer=lambda data: self._parse(response_cls, data),
+            request_serializer=None if raw else request_cls.SerializeToString,
+            response_deserializer=response_cls.FromString,
         )
-        return call(request, timeout=self.timeout)
 
-    def clear_scenario(self) -> None:
-        self._unary(
-            "/aalyria.spacetime.api.nbi.v1alpha.ScenarioService/ClearScenario",
-            self.ClearScenarioRequest(),
-            empty_pb2.Empty,
+    async def _unary_raw(self, method: str, payload: bytes, request_cls, response_cls):
+        return await self._stub(method, request_cls, response_cls, raw=True)(payload, timeout=self.timeout)
+
+    async def clear_scenario(self) -> None:
+        await self._unary_raw(_CLEAR_SCENARIO, self._empty_clear_req, self.ClearScenarioRequest, empty_pb2.Empty)
+
+    async def create_platform(self, name: str, typ: str, coords: Tuple[float, float, float]):
+        payload = bytearray(self._platform_template)
+        for offset, value in zip(self._platform_coord_offsets, coords):
+            struct.pack_into("<d", payload, offset, value)
+        payload += _string_field(self._platform_name_field, name)
+        payload += _string_field(self._platform_type_field, typ)
+        return await self._unary_raw(_CREATE_PLATFORM, bytes(payload), self.PlatformDefinition, self.PlatformDefinition)
+
+    def platform(self, name: str, typ: str, coords: Tuple[float, float, float]):
+        point = self.Cartesian(x_m=coords[0], y_m=coords[1], z_m=coords[2])
+        return self.PlatformDefinition(
+            name=name,
+            type=typ,
+            motion_source=self.motion_unknown,
+            coordinates=self.Motion(ecef_fixed=self.PointAxes(point=point)),
         )
 
-    def create_platform(self, name: str, typ: str, coords: Tuple[float, float, float]):
-        plat = self.PlatformDefinition()
-        plat.name = name
-        plat.type = typ
-        plat.motion_source = self.motion_unknown
-        plat.coordinates.ecef_fixed.point.x_m = coords[0]
-        plat.coordinates.ecef_fixed.point.y_m = coords[1]
-        plat.coordinates.ecef_fixed.point.z_m = coords[2]
-        return self._unary(
-            "/aalyria.spacetime.api.nbi.v1alpha.PlatformService/CreatePlatform",
-            plat,
-            self.PlatformDefinition,
-        )
+    async def create_node(self, node_id: str, platform_id: str, iface_id: str, transceiver_id: str):
+        node = self.node(node_id, platform_id, iface_id, transceiver_id)
+        call = self._stub(_CREATE_NODE, self.NetworkNode, self.NetworkNode)
+        return await call(node, timeout=self.timeout)
 
-    def create_node(self, node_id: str, platform_id: str, iface_id: str, transceiver_id: str):
-        node = self.NetworkNode()
-        node.node_id = node_id
-        node.type = "ROUTER"
-        iface = self.NetworkInterface()
-        iface.interface_id = iface_id
-        iface.wireless.platform = platform_id
-        iface.wireless.transceiver_model_id.transceiver_model_id = transceiver_id
-        node.node_interface.append(iface)
-        return self._unary(
-            "/aalyria.spacetime.api.nbi.v1alpha.NetworkNodeService/CreateNode",
-            node,
-            self.NetworkNode,
+    def node(self, node_id: str, platform_id: str, iface_id: str, transceiver_id: str):
+        wireless = self.WirelessDevice(
+            platform=platform_id,
+            transceiver_model_id=self.TransceiverModelId(transceiver_model_id=transceiver_id),
         )
-
-    def create_link(self, a_node: str, a_iface: str, b_node: str, b_iface: str):
-        link = self.BidirectionalLink()
-        link.a_network_node_id = a_node
-        link.a_tx_interface_id = a_iface
-        link.a_rx_interface_id = a_iface
-        link.b_network_node_id = b_node
-        link.b_tx_interface_id = b_iface
-        link.b_rx_interface_id = b_iface
-        return self._unary(
-            "/aalyria.spacetime.api.nbi.v1alpha.NetworkLinkService/CreateLink",
-            link,
-            self.BidirectionalLink,
+        iface = self.NetworkInterface(interface_id=iface_id, wireless=wireless)
+        return self.NetworkNode(node_id=node_id, type="ROUTER", node_interface=[iface])
+
+    async def create_link(self, a_node: str, a_iface: str, b_node: str, b_iface: str):
+        link = self.link(a_node, a_iface, b_node, b_iface)
+        call = self._stub(_CREATE_LINK, self.BidirectionalLink, self.BidirectionalLink)
+        return await call(link, timeout=self.timeout)
+
+    def link(self, a_node: str, a_iface: str, b_node: str, b_iface: str):
+        return self.BidirectionalLink(
+            a_network_node_id=a_node,
+            a_tx_interface_id=a_iface,
+            a_rx_interface_id=a_iface,
+            b_network_node_id=b_node,
+            b_tx_interface_id=b_iface,
+            b_rx_interface_id=b_iface,
         )
 
-    def get_scenario(self):
-        return self._unary(
-            "/aalyria.spacetime.api.nbi.v1alpha.ScenarioService/GetScenario",
-            self.GetScenarioRequest(),
-            self.ScenarioSnapshot,
-        )
+    async def load_scenario(self, platforms: Iterable, nodes: Iterable, links: Iterable) -> None:
+        """Replace the scenario with the given entities in a single RPC.
+
+        The server always clears the scenario before loading.
+        """
+        req = self.LoadScenarioRequest(platforms=platforms, nodes=nodes, links=links)
+        call = self._stub(_LOAD_SCENARIO, self.LoadScenarioRequest, empty_pb2.Empty)
+        await call(req, timeout=self.timeout)
+
+    async def get_scenario(self):
+        return await self._unary_raw(_GET_SCENARIO, self._empty_get_req, self.GetScenarioRequest, self.ScenarioSnapshot)
+
+
+def _write_lines(lines: List[str]) -> None:
+    sys.stdout.write("\n".join(lines) + "\n")
 
 
 def print_platforms(platforms: Iterable, indent: str = "") -> None:
-    print(f"{indent}Platforms:")
+    lines = [f"{indent}Platforms:"]
+    item = f"{indent}- "
     for p in platforms:
-        pt = getattr(getattr(getattr(p, "coordinates", None), "ecef_fixed", None), "point", None)
         coord = "n/a"
-        if pt:
+        if p.HasField("coordinates") and p.coordinates.HasField("ecef_fixed"):
+            pt = p.coordinates.ecef_fixed.point
             coord = f"({pt.x_m:.1f}, {pt.y_m:.1f}, {pt.z_m:.1f}) m"
-        print(f"{indent}- {p.name} [{p.type}] coords={coord}")
+        lines.append(f"{item}{p.name} [{p.type}] coords={coord}")
+    _write_lines(lines)
 
 
 def print_nodes(nodes: Iterable, indent: str = "") -> None:
-    print(f"{indent}Nodes:")
+    lines = [f"{indent}Nodes:"]
+    item = f"{indent}- "
+    sub = f"{indent}  interface "
     for n in nodes:
-        print(f"{indent}- {n.node_id} [{n.type}]")
+        lines.append(f"{item}{n.node_id} [{n.type}]")
         for iface in n.node_interface:
             wireless = iface.wireless
-            trx = getattr(getattr(wireless, "transceiver_model_id", None), "transceiver_model_id", "")
-            print(f"{indent}  interface {iface.interface_id} platform={wireless.platform} trx={trx}")
+            trx = (
+                wireless.transceiver_model_id.transceiver_model_id
+                if wireless.HasField("transceiver_model_id")
+                else ""
+            )
+            lines.append(f"{sub}{iface.interface_id} platform={wireless.platform} trx={trx}")
+    _write_lines(lines)
 
 
 def print_links(links: Iterable, indent: str = "") -> None:
-    print(f"{indent}Links:")
-    for l in links:
-        print(
-            f"{indent}- {l.a_network_node_id}/{l.a_tx_interface_id} <-> "
-            f"{l.b_network_node_id}/{l.b_tx_interface_id}"
+    item = f"{indent}- "
+    lines = [f"{indent}Links:"]
+    lines.extend(
+        f"{item}{l.a_network_node_id}/{l.a_tx_interface_id} <-> {l.b_network_node_id}/{l.b_tx_interface_id}"
+        for l in links
+    )
+    _write_lines(lines)
+
+
+async def create_entities(client: DynamicNBI, skip_clear: bool, transceiver_id: str) -> None:
+    if not skip_clear:
+        await client.clear_scenario()
+
+    # Independent creates are issued concurrently; each stage waits for the
+    # previous one because nodes reference platforms and links reference nodes.
+    await asyncio.gather(
+        client.create_platform("platform-ground", "GROUND_STATION", (6_372_000.0, 0.0, 0.0)),
+        client.create_platform("platform-sat", "SATELLITE", (6_871_000.0, 0.0, 0.0)),
+    )
+    await asyncio.gather(
+        client.create_node("node-ground", "platform-ground", "if-ground", transceiver_id),
+        client.create_node("node-sat", "platform-sat", "if-sat", transceiver_id),
+    )
+    await client.create_link("node-ground", "if-ground", "node-sat", "if-sat")
+
+
+async def bootstrap(client: DynamicNBI, args: argparse.Namespace):
+    if args.load:
+        await client.load_scenario(
+            platforms=[
+                client.platform("platform-ground", "GROUND_STATION", (6_372_000.0, 0.0, 0.0)),
+                client.platform("platform-sat", "SATELLITE", (6_871_000.0, 0.0, 0.0)),
+            ],
+            nodes=[
+                client.node("node-ground", "platform-ground", "if-ground", args.transceiver_id),
+                client.node("node-sat", "platform-sat", "if-sat", args.transceiver_id),
+            ],
+            links=[client.link("node-ground", "if-ground", "node-sat", "if-sat")],
         )
+    else:
+        await create_entities(client, args.skip_clear, args.transceiver_id)
+
+    return await client.get_scenario()
+
+
+async def run(args: argparse.Namespace) -> None:
+    async with grpc.aio.insecure_channel(args.endpoint, options=_CHANNEL_OPTIONS) as channel:
+        client = DynamicNBI(channel, args.descriptor, timeout=args.timeout)
+        snapshot = await bootstrap(client, args)
+    if args.quiet:
+        return
+
+    print("\nScenario snapshot:")
+    print_platforms(snapshot.platforms, indent="  ")
+    print_nodes(snapshot.nodes, indent="  ")
+    print_links(snapshot.links, indent="  ")
+
+    # For debugging, you can dump the whole snapshot:
+    # from google.protobuf import json_format
+    # print(json_format.MessageToJson(snapshot, including_default_value_fields=False, indent=2))
 
 
 def main() -> None:
@@ -164,28 +328,15 @@ def main() -> None:
     )
     parser.add_argument("--timeout", type=float, default=10.0, help="Per-RPC timeout in seconds")
     parser.add_argument("--skip-clear", action="store_true", help="Do not call ClearScenario first")
+    parser.add_argument(
+        "--load",
+        action="store_true",
+        help="Create all entities with a single LoadScenario call (always replaces the scenario)",
+    )
+    parser.add_argument("--quiet", action="store_true", help="Do not print the fetched scenario snapshot")
     args = parser.parse_args()
 
-    channel = grpc.insecure_channel(args.endpoint)
-    client = DynamicNBI(channel, args.descriptor, timeout=args.timeout)
-
-    if not args.skip_clear:
-        client.clear_scenario()
-
-    client.create_platform("platform-ground", "GROUND_STATION", (6_372_000.0, 0.0, 0.0))
-    client.create_platform("platform-sat", "SATELLITE", (6_871_000.0, 0.0, 0.0))
-    client.create_node("node-ground", "platform-ground", "if-ground", args.transceiver_id)
-    client.create_node("node-sat", "platform-sat", "if-sat", args.transceiver_id)
-    client.create_link("node-ground", "if-ground", "node-sat", "if-sat")
-
-    snapshot = client.get_scenario()
-    print("\nScenario snapshot:")
-    print_platforms(snapshot.platforms, indent="  ")
-    print_nodes(snapshot.nodes, indent="  ")
-    print_links(snapshot.links, indent="  ")
-
-    # For debugging, you can dump the whole snapshot:
-    # print(json_format.MessageToJson(snapshot, including_default_value_fields=False, indent=2))
+    asyncio.run(run(args))
 
 
 if __name__ == "__main__":